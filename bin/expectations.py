@@ -14,8 +14,8 @@ secret testcase.
 >>> e = Expectations({'verdict': ['WA', 'TLE'], 'sample': 'AC', 'secret/038-edgecase': 'WA'})
 >>> e.verdicts() == set(['WA', 'TLE'])
 True
->>> e.verdicts("sample")
-{'AC'}
+>>> e.verdicts("sample") == {'AC'}
+True
 >>> e.is_expected('WA', "secret/038-edgecase")
 True
 
@@ -40,8 +40,8 @@ submission residing in
 where <dirname> can be 'accepted', 'wrong_answer', 'time_limit_exceeded', or 'run_time_error'.
 
 >>> e = Expectations(dirname='wrong_answer')
->>> e.verdicts()
-{'WA'}
+>>> e.verdicts() == {'WA'}
+True
 
 Terminology
 -----------
@@ -59,8 +59,23 @@ range
     A string of two space-separated numbers, like '0 30' or '-inf 43' or '3.14 3.14'.
 """
 
+import posixpath
 from pathlib import Path
-from functools import lru_cache
+
+# Verdict sets are immutable and shared between all nodes that use them.
+_ALL_VERDICTS = frozenset(["AC", "WA", "TLE", "RTE"])
+_ONLY_AC = frozenset(["AC"])
+# All other verdict sets are interned here as they occur (there are at most 16).
+_SHARED_VERDICTS = {verdicts: verdicts for verdicts in [_ALL_VERDICTS, _ONLY_AC]}
+
+
+def _intern(verdicts: frozenset[str]) -> frozenset[str]:
+    """The shared instance of this set of verdicts"""
+    return _SHARED_VERDICTS.setdefault(verdicts, verdicts)
+
+
+# The expectation of every node for which nothing is specified or inferred
+_DEFAULT_EXPECTATION = (_ALL_VERDICTS, "-inf inf")
 
 
 class Expectations:
@@ -109,24 +124,28 @@ class Expectations:
             can be specified as the empty string '' or as '.'.
 
         """
-        self._testdata_settings: dict[Path, dict[str, str]] = (
-            {Path(k): v for k, v in testdata_settings.items()}
+        # Nodes are identified by normalised strings like 'secret/group1'; the root is '.'
+        self._testdata_settings: dict[str, dict[str, str]] = (
+            {posixpath.normpath(k): v for k, v in testdata_settings.items()}
             if testdata_settings is not None
             else {}
         )
-        self._specified_verdicts: dict[Path, set[str]] = dict()
-        self._specified_scores: dict[Path, str] = dict()
+        self._specified_verdicts: dict[str, frozenset[str]] = dict()
+        self._specified_scores: dict[str, str] = dict()
+        # The resolved expectations and testdata settings of nodes, filled in as needed
+        self._resolved: dict[str, tuple[frozenset[str], str]] = dict()
+        self._resolved_settings: dict[str, dict[str, str]] = dict()
 
         # Populate _specified_{verdicts, scores} from expectations. This involves
         # recursively parsing the expectations, which may be a dict of dicts.
-        def walk(exp: dict | list[str] | str, path):
+        def walk(exp: dict | list[str] | str, path: str):
             if isinstance(exp, dict):
                 verdicts: str | list[str] | None = exp.pop('verdict', None)
                 scores = exp.pop('score', None)
                 for key in exp:  # 'sample', 'secret', 'edgecases', '003-random', ...
-                    if path == Path() and key not in ['sample', 'secret']:
+                    if path == '.' and key not in ['sample', 'secret']:
                         raise ValueError(f"Expected testgroup 'sample' or 'secret', not {key}")
-                    walk(exp[key], path / key)
+                    walk(exp[key], posixpath.normpath(posixpath.join(path, key)))
             else:
                 verdicts = exp
                 scores = None
@@ -135,16 +154,16 @@ class Expectations:
                 if scores is not None:
                     raise ValueError(f"At {path}, 'score' specified without 'verdict'")
                 return
-            self._specified_verdicts[path] = set(
-                [verdicts] if isinstance(verdicts, str) else verdicts
-            )
+            verdict_set = frozenset([verdicts] if isinstance(verdicts, str) else verdicts)
+            # use the shared instances where possible, see _DEFAULT_EXPECTATION
+            self._specified_verdicts[path] = _intern(verdict_set)
 
             if scores is not None:
                 self._check_scores(scores, path)
             self._specified_scores[path] = scores
 
         if expectations is not None:
-            walk(expectations, Path())
+            walk(expectations, '.')
 
         # Now consider the two ways of setting the root expecation. First, look at dirname.
         dirnamemap = {
@@ -153,7 +172,7 @@ class Expectations:
             "time_limit_exceeded": "TLE",
             "run_time_error": "RTE",
         }
-        dirname_verdict = set([dirnamemap[dirname]]) if dirname in dirnamemap else None
+        dirname_verdict = _intern(frozenset([dirnamemap[dirname]])) if dirname in dirnamemap else None
 
         # Second, look at verdict lists specified by @EXPECTED_RESULTS@
         if expected_results:
@@ -167,7 +186,9 @@ class Expectations:
             }
             if not all(v in domjudge_verdict_map for v in expected_results):
                 raise ValueError(f"Invalid expected results {expected_results}")
-            expected_results_short = set(domjudge_verdict_map[v] for v in expected_results)
+            expected_results_short = _intern(
+                frozenset(domjudge_verdict_map[v] for v in expected_results)
+            )
         else:
             expected_results_short = None
 
@@ -176,12 +197,16 @@ class Expectations:
         for root_verdict in [dirname_verdict, expected_results_short]:
             if root_verdict is None:
                 continue
-            yaml_verdict = self._specified_verdicts.get(Path())
+            yaml_verdict = self._specified_verdicts.get('.')
             if yaml_verdict:
                 if yaml_verdict != root_verdict:
                     raise ValueError("Contradictory expectations for root")
             else:
-                self._specified_verdicts[Path()] = root_verdict
+                self._specified_verdicts['.'] = root_verdict
+
+        # Resolve the specified nodes and their ancestors now; other nodes inherit from these.
+        for path in self._specified_verdicts:
+            self[path]
 
     def _check_scores(self, scores: str, path):
         # Ensure that the scores make syntactic sense, like '24' or '0 100' or even '-inf 53.1',
@@ -205,7 +230,6 @@ class Expectations:
         if not range_lo <= exp_lo <= exp_hi <= range_hi:
             raise ValueError(f"Expectation {scores} violates testdata setting")
 
-    @lru_cache
     def __getitem__(self, node: str):
         """The expecations for the given node.
 
@@ -219,26 +243,32 @@ class Expectations:
         -------
         A tuple (verdicts, range); see the methods of those names.
         """
-        path = Path(node)
-        verdicts = self._specified_verdicts.get(path) or set(["AC", "WA", "TLE", "RTE"])
-        scores = self._specified_scores.get(path) or "-inf inf"
+        path = posixpath.normpath(node)
+        if path in self._resolved:
+            return self._resolved[path]
+        verdicts = self._specified_verdicts.get(path) or _ALL_VERDICTS
+        scores = self._specified_scores.get(path) or _DEFAULT_EXPECTATION[1]
 
         # Check if an AC expectation is implied by an ancestral expectation.
         # Such an inference happens unless various grader_flags say differently.
-        if path != Path():
-            parent = path.parent
+        if path != '.':
+            parent = path.rpartition('/')[0] or '.'
             grader_flags = self.testdata_settings(parent)['grader_flags']
             if (
-                (self.verdicts(parent) == set(['AC']))
+                (self.verdicts(parent) == _ONLY_AC)
                 and 'accept_if_any_accepted' not in grader_flags
                 and 'always_accept' not in grader_flags
-                and not (node == 'sample' and 'ignore_sample' in grader_flags)
+                and not (path == 'sample' and 'ignore_sample' in grader_flags)
             ):
                 if 'AC' not in verdicts:
                     raise ValueError(f"Conflicting expectations for {node}: {verdicts}")
-                verdicts = set(['AC'])
+                verdicts = _ONLY_AC  # the intersection of verdicts and {'AC'}
 
-        return (verdicts, scores)
+        if verdicts is _ALL_VERDICTS and scores == _DEFAULT_EXPECTATION[1]:
+            self._resolved[path] = _DEFAULT_EXPECTATION
+        else:
+            self._resolved[path] = (verdicts, scores)
+        return self._resolved[path]
 
     def verdicts(self, node=''):
         """The verdicts expected for this node.
@@ -250,7 +280,7 @@ class Expectations:
             Empty string "", ".", or missing argument means the root.
         Return
         ------
-        A nonempty subset of {"AC", "WA", "TLE", "RTE"}
+        A nonempty frozenset, a subset of {"AC", "WA", "TLE", "RTE"}
         """
 
         return self[node][0]
@@ -266,17 +296,23 @@ class Expectations:
         """
         return self[node][1]
 
-    @lru_cache
-    def testdata_settings(self, path) -> dict[str, str]:
+    def testdata_settings(self, path: str | Path) -> dict[str, str]:
         """The testdata settings of 'grader_flags' and 'range' for this path,
         possibly as implied by ancestors and defaults.
+
+        The path is a string or Path like 'secret/group1'; '' or '.' is the root.
         """
-        parent_settings = (
-            self.testdata_settings(path.parent)
-            if path != Path()
-            else {'grader_flags': '', 'range': '-inf inf'}  # defaults according to specification
-        )
-        return parent_settings | (self._testdata_settings.get(path) or {})
+        path = posixpath.normpath(path)
+        if path not in self._resolved_settings:
+            parent_settings = (
+                self.testdata_settings(path.rpartition('/')[0] or '.')
+                if path != '.'
+                else {'grader_flags': '', 'range': '-inf inf'}  # defaults as per specification
+            )
+            self._resolved_settings[path] = parent_settings | (
+                self._testdata_settings.get(path) or {}
+            )
+        return self._resolved_settings[path]
 
     def is_expected(self, grade: str | tuple[str, float], node=''):
         """Is the given grade expected by the given node?
@@ -50,81 +50,266 @@ only a subset of testcases.
 
 """
 
-import re
+import atexit
+import enum
+import heapq
+import importlib.util
+import math
+import posixpath
+import select
 import subprocess
+import sys
+import threading
+from array import array
 from pathlib import Path
-from functools import lru_cache
+from functools import cached_property, lru_cache
+from operator import itemgetter
 
-from util import log, error, debug
+from util import log, warn, error, debug
 from expectations import Expectations
 
 # pylint: disable = import-error
 from colorama import Fore, Style
 import config
 
+# All verdicts, in the order used for their integer codes; 'AC' must have code 0.
+VERDICTS = ('AC', 'WA', 'TLE', 'RTE', 'JE')
+_VERDICT_CODE = {verdict: code for code, verdict in enumerate(VERDICTS)}
 
-def ancestors(paths):
-    """Return the set of all ancestors of the given paths"""
-    return set(ancestor for path in paths for ancestor in path.parents)
+# The short verdicts for the verdicts used by the rest of BAPCtools
+SHORT_VERDICTS = {
+    'ACCEPTED': 'AC',
+    'WRONG_ANSWER': 'WA',
+    'RUN_TIME_ERROR': 'RTE',
+    'TIME_LIMIT_EXCEEDED': 'TLE',
+}
+
+
+def ancestors(paths) -> set[str]:
+    """Return the set of all ancestors of the given paths, as strings like 'secret/group1';
+    the root is '.'.
+
+    >>> sorted(ancestors(['secret/group1/foo', 'sample/1']))
+    ['.', 'sample', 'secret', 'secret/group1']
+    """
+    # In sorted order, the ancestors shared with the previous path come first and
+    # have all been added already, so stop at the first ancestor of the previous path.
+    result = set()
+    previous = ''
+    for path in sorted(str(path) for path in paths):
+        i = path.rfind('/')
+        while i > 0 and not (previous.startswith(path[:i]) and previous[i : i + 1] == '/'):
+            result.add(path[:i])
+            i = path.rfind('/', 0, i)
+        previous = path
+    if previous:
+        result.add('.')
+    return result
 
 
 # pylint: disable=too-few-public-methods
 class TestData:
     """The structure of testcases and testgroups of a problem."""
 
-    # Internally, testgroups are identified by Path objects; the root is Path()
-    # whose children (if they exist) are the testgroups Path('sample') and Path('secret').
-    # All other testgroup paths start with 'sample/' or 'secret/'
+    # Internally, testgroups are identified by strings; the root is '.'
+    # whose children (if they exist) are the testgroups 'sample' and 'secret'.
+    # All other testgroups start with 'sample/' or 'secret/'.
+    # Testcase names never contain '/', so they can only collide with these three;
+    # testcases and testgroups are kept apart by having separate ids.
 
     def __init__(self, cases, settings=None):
         """See Grades.__init__()"""
 
-        self.root = Path()
-        casepaths = sorted(Path(tc) for tc in cases)
-
-        self.cases: list[str] = sorted(tp.name for tp in casepaths)
+        self.root = '.'
 
         # The testgroups containing a testcase
-        self.groups_for_case: dict[str, list[Path]] = {tc: [] for tc in self.cases}
-
-        # The testgroups and testcases contained in a testgroup, in alphabetic order.
-        # Testgroups have type Path, testcases have type str.
-        self.gradeables_for_group: dict[Path, list[Path | str]] = {
-            path: [] for path in ancestors(casepaths)
+        self.groups_for_case: dict[str, list[str]] = {}
+
+        # The parent of every testgroup except the root
+        self.parent: dict[str, str] = {}
+
+        # In one pass over the testcases, collect the testcases of each testgroup (in
+        # alphabetic order, since the paths are sorted) and the subgroups of each testgroup.
+        # Ancestors are added until reaching a testgroup that is already known.
+        cases_for_group: dict[str, list[str]] = {}
+        subgroups: dict[str, set[str]] = {}
+        # Duplicates (say, a string and a Path for the same testcase) are dropped here.
+        for tc in sorted(set(str(tc) for tc in cases)):
+            group, _, name = tc.rpartition('/')
+            group = group or self.root
+            name = sys.intern(name)  # names are used as keys everywhere
+            self.groups_for_case.setdefault(name, []).append(group)
+            cases_for_group.setdefault(group, []).append(name)
+            child, path = None, group
+            while True:
+                known = path in subgroups
+                if not known:
+                    subgroups[path] = set()
+                if child is not None:
+                    subgroups[path].add(child)
+                if known or path == self.root:
+                    break
+                child, path = path, path.rpartition('/')[0] or self.root
+                self.parent[child] = path
+
+        self.cases: list[str] = sorted(self.groups_for_case)
+        groups = sorted(subgroups)
+        self.subgroups: dict[str, list[str]] = {path: sorted(subgroups[path]) for path in groups}
+
+        # The last component of every testgroup's path; empty for the root
+        self.name: dict[str, str] = {path: path.rpartition('/')[2] for path in self.parent}
+        self.name[self.root] = ''
+
+        # The depth of every testgroup; the root has depth 0
+        self.depth: dict[str, int] = {path: path.count('/') + 1 for path in self.parent}
+        self.depth[self.root] = 0
+
+        # The testgroups ordered by depth, so every testgroup comes after its parent
+        self.groups: list[str] = sorted(groups, key=self.depth.__getitem__)
+
+        # Every gradeable has an integer id; testgroups (by depth) come before testcases.
+        # A testcase may have the same name as a testgroup, say 'secret/sample', so the
+        # ids of testgroups and testcases are looked up separately.
+        self.id: dict[str, int] = {path: i for i, path in enumerate(self.groups)}
+        self.case_id: dict[str, int] = {
+            name: i for i, name in enumerate(self.cases, start=len(self.groups))
         }
+        self.nodes: list[str] = self.groups + self.cases
+
+        # The testgroups and testcases contained in a testgroup, in alphabetic order;
+        # this is important for grader settings such as first_error, ignore_sample.
+        # The same by id, for grading: the ids of the children of every testgroup,
+        # and for every node the pairs (id of a testgroup containing it, its index there).
+        self.gradeables_for_group: dict[str, list[str]] = {}
+        self.children_ids: list[list[int]] = []
+        for path in self.groups:
+            children = list(
+                heapq.merge(
+                    ((child, self.id[child]) for child in self.subgroups[path]),
+                    ((name, self.case_id[name]) for name in cases_for_group.get(path, [])),
+                )
+            )
+            self.gradeables_for_group[path] = [child for child, _ in children]
+            self.children_ids.append([child_id for _, child_id in children])
+        self.parent_ids: list[list[tuple[int, int]]] = [[] for _ in self.nodes]
+        for group_id, children in enumerate(self.children_ids):
+            for index, child_id in enumerate(children):
+                self.parent_ids[child_id].append((group_id, index))
+        # The id of the parent of every testgroup; -1 for the root
+        self.group_parent = array('i', [-1]) * len(self.groups)
+        for group_id in range(1, len(self.groups)):
+            self.group_parent[group_id] = self.parent_ids[group_id][0][0]
+
+        self._testdata_settings: dict[str, dict[str, str]] = (
+            {posixpath.normpath(k): v for k, v in settings.items()} if settings is not None else {}
+        )
+        # The settings of every testgroup, resolved once from its parent's settings (which
+        # come first in self.groups) and its own, starting with the defaults at the root.
+        self.resolved_settings: dict[str, dict[str, str]] = {}
+        for path in self.groups:
+            inherited = (
+                self.resolved_settings[self.parent[path]]
+                if path != self.root
+                else DEFAULT_TESTDATA_SETTINGS
+            )
+            self.resolved_settings[path] = inherited | (self._testdata_settings.get(path) or {})
+        self.settings_by_id: list[dict[str, str]] = [
+            self.resolved_settings[path] for path in self.groups
+        ]
+        # Warn about unknown grader flags right away, once per flag
+        unknown_flags = {
+            flag
+            for s in self.settings_by_id
+            if isinstance(s['grader_flags'], str)
+            for flag in s['grader_flags'].split()
+            if not _grader_flag(flag)
+        }
+        for flag in sorted(unknown_flags):
+            warn(f'Unknown grader flag {flag} is ignored')
+        # The settings used for every grade, by testgroup id
+        self.break_on_reject = bytearray(s['on_reject'] == 'break' for s in self.settings_by_id)
+        self.accept_score: list[str] = [s['accept_score'] for s in self.settings_by_id]
+        self.reject_score: list[str] = [s['reject_score'] for s in self.settings_by_id]
+
+    def __iter__(self):
+        """The paths of all testgroups and testcases, breadth-first; the children of a
+        testgroup come in the order of self.gradeables_for_group.
+
+        >>> list(TestData(['secret/a/foo', 'sample/1']))
+        ['.', 'sample', 'secret', 'sample/1', 'secret/a', 'secret/a/foo']
+        """
+        num_groups = len(self.groups)
+        # pairs (path, id); testcase paths are not testgroup names, so keep the ids
+        level = [(self.root, 0)]
+        while level:
+            yield from (path for path, _ in level)
+            level = [
+                (
+                    self.nodes[child_id]
+                    if child_id < num_groups or path == self.root
+                    else f'{path}/{self.nodes[child_id]}',
+                    child_id,
+                )
+                for path, node_id in level
+                if node_id < num_groups
+                for child_id in self.children_ids[node_id]
+            ]
+
+    @cached_property
+    def label_width(self) -> int:
+        """The width of the longest testgroup label in a tree drawing, see Grades.tree_format"""
+        return max(2 * depth + len(self.name[path]) for path, depth in self.depth.items())
+
+    def testdata_settings(self, path: str | Path) -> dict[str, str]:
+        """The testdata settings for this path, possibly as implied by ancestors and defaults.
+
+        The path is a testgroup like 'secret/group1' or '.', either as a string or a Path.
+        The returned dict must not be modified.
+        """
+        if path not in self.resolved_settings:
+            path = posixpath.normpath(path)
+        return self.resolved_settings[path]
 
-        for path in casepaths:
-            self.groups_for_case[path.name].append(path.parent)
-            self.gradeables_for_group[path.parent].append(path.name)
 
-        for path in self.gradeables_for_group:
-            if path != self.root:
-                self.gradeables_for_group[path.parent].append(path)
-        # sort all children of a testgroup lexicographically; this is
-        # important for grader settings such as first_error, ignore_sample
-        for path in self.gradeables_for_group:
-            self.gradeables_for_group[path].sort(key=str)
+# The testdata settings at the root, unless set explicitly
+DEFAULT_TESTDATA_SETTINGS = {
+    'on_reject': 'break',
+    # 'grading': not implemented, so not set
+    'grader_flags': '',
+    'accept_score': '1',
+    'reject_score': '0',
+    'range': '-inf inf',
+}
 
-        self._testdata_settings: dict[Path, dict[str, str]] = (
-            {Path(k): v for k, v in settings.items()} if settings is not None else {}
-        )
 
-    @lru_cache
-    def testdata_settings(self, path: Path):
-        """The testdata settings for this path, possibly as implied by ancestors and defaults."""
-        parent_settings = (
-            self.testdata_settings(path.parent)
-            if path != Path()
-            else {
-                'on_reject': 'break',
-                # 'grading': not implemented, so not set
-                'grader_flags': '',
-                'accept_score': '1',
-                'reject_score': '0',
-                'range': '-inf inf',
-            }
+def shared_testdata(cases, settings=None) -> TestData:
+    """The TestData for these cases and settings, shared with other callers using the same ones.
+
+    All submissions of a problem are graded on the same testdata, so this avoids rebuilding
+    the tree for every submission. The returned TestData must not be modified.
+    """
+    cases = frozenset(cases)
+    try:
+        # keys are normalised like in TestData, so 'secret/' and 'secret' share the tree
+        settings_key = (
+            tuple(
+                sorted(
+                    (posixpath.normpath(k), tuple(sorted((v or {}).items())))
+                    for k, v in settings.items()
+                )
+            )
+            if settings is not None
+            else None
         )
-        return parent_settings | (self._testdata_settings.get(path) or {})
+        return _cached_testdata(cases, settings_key)
+    except TypeError:  # unhashable settings values, don't cache
+        return TestData(cases, settings)
+
+
+@lru_cache(maxsize=4)
+def _cached_testdata(cases: frozenset, settings_key: tuple | None) -> TestData:
+    settings = {k: dict(v) for k, v in settings_key} if settings_key is not None else None
+    return TestData(cases, settings)
 
 
 class Grades:
@@ -149,9 +334,33 @@ class Grades:
     You can access the verdicts of testgroups by name
     >>> g.verdict('sample'), g.verdict('secret')
     ('AC', 'WA')
+
+    When all testcases are graded before the result is needed, grade the testgroups
+    only once, at the end
+    >>> g = Grades(['sample/1', 'secret/foo', 'secret/bar'], streaming=False)
+    >>> _ = g.set_verdict('1', 'AC')
+    >>> _ = g.set_verdict('bar', 'AC')
+    >>> _ = g.set_verdict('foo', 'WA')
+    >>> g.verdict() is None
+    True
+    >>> _ = g.finalize()
+    >>> g.verdict()
+    'WA'
     """
 
-    def __init__(self, testcasepaths, testdata_settings=None):
+    __slots__ = (
+        'testdata',
+        'streaming',
+        '_verdict',
+        '_score',
+        '_ready',
+        '_ungraded',
+        '_first_rejection',
+        '_graded_prefix',
+        '_child_grades',
+    )
+
+    def __init__(self, testcasepaths, testdata_settings=None, streaming=True):
         """
         Arguments
         ---------
@@ -160,11 +369,109 @@ class Grades:
 
         testdata_settings: maps testgroups (strings) to settings (dicts),
             typically  given in 'testdata.yaml'
+
+        streaming: if True, testgroups are graded as soon as set_verdict makes this possible;
+            otherwise only by finalize()
+        """
+        self.streaming = streaming
+        self.testdata = shared_testdata(testcasepaths, testdata_settings)
+        # Grades are stored in arrays indexed by node id (see TestData.nodes). A verdict is
+        # stored as its index in VERDICTS, a score of None as NaN; _ready marks graded nodes.
+        size = len(self.testdata.nodes)
+        self._verdict = array('b', [-1]) * size
+        self._score = array('d', [0.0]) * size
+        self._ready = bytearray(size)
+        # For each testgroup (indexed by id, like the grades): the number of ungraded
+        # children, the index of the first rejected child (or the number of children),
+        # and the length of the longest prefix of graded children. These are updated
+        # whenever a child is graded.
+        num_groups = len(self.testdata.groups)
+        self._ungraded = array('i', [0]) * num_groups
+        self._first_rejection = array('i', [0]) * num_groups
+        self._graded_prefix = array('i', [0]) * num_groups
+        for path, children in self.testdata.gradeables_for_group.items():
+            self._ungraded[self.testdata.id[path]] = len(children)
+            self._first_rejection[self.testdata.id[path]] = len(children)
+        # The grades of the children of each testgroup, in order, with scores filled in
+        # from the testgroup's settings; None for ungraded children
+        self._child_grades: list[list[tuple[str, float | str] | None]] = [
+            [None] * len(self.testdata.gradeables_for_group[path]) for path in self.testdata.groups
+        ]
+
+    def copy(self) -> 'Grades':
+        """A copy of these grades, on the same (shared) testdata.
+
+        >>> g = Grades(['secret/foo', 'secret/bar'])
+        >>> h = g.copy()
+        >>> _ = h.set_verdict('bar', 'WA')
+        >>> g.grade('secret'), h.grade('secret')
+        (None, ('WA', 0.0))
         """
-        self.testdata = TestData(testcasepaths, testdata_settings)
-        self._grade: dict[Path | str, tuple[str, float] | None] = {
-            path: None for path in self.testdata.gradeables_for_group
-        } | {tcname: None for tcname in self.testdata.cases}
+        other = Grades.__new__(Grades)
+        other.testdata = self.testdata
+        other.streaming = self.streaming
+        other._verdict = self._verdict[:]
+        other._score = self._score[:]
+        other._ready = self._ready[:]
+        other._ungraded = self._ungraded[:]
+        other._first_rejection = self._first_rejection[:]
+        other._graded_prefix = self._graded_prefix[:]
+        other._child_grades = [child_grades[:] for child_grades in self._child_grades]
+        return other
+
+    def _node_id(self, node) -> int:
+        """The id of a node given as a testcase name, a testgroup string or Path, or None."""
+        if node is None:
+            return 0  # the root is the first testgroup
+        # a testcase may have the name of a testgroup; the testcase comes first
+        i = self.testdata.case_id.get(node)
+        if i is None:
+            i = self.testdata.id.get(node)
+        return i if i is not None else self.testdata.id[posixpath.normpath(node)]
+
+    def _set_grade(self, i: int, grade: tuple[str, float | None]):
+        """Set the grade of the ungraded testcase or testgroup with id i."""
+        self._verdict[i] = _VERDICT_CODE[grade[0]]
+        self._score[i] = math.nan if grade[1] is None else grade[1]
+        self._ready[i] = 1
+        for parent_id, index in self.testdata.parent_ids[i]:
+            self._ungraded[parent_id] -= 1
+            if grade[1] is not None:
+                child_grade = grade
+            elif grade[0] == 'AC':
+                child_grade = (grade[0], self.testdata.accept_score[parent_id])
+            else:
+                child_grade = (grade[0], self.testdata.reject_score[parent_id])
+            self._child_grades[parent_id][index] = child_grade
+            if grade[0] != 'AC' and index < self._first_rejection[parent_id]:
+                self._first_rejection[parent_id] = index
+            if index == self._graded_prefix[parent_id]:
+                children = self.testdata.children_ids[parent_id]
+                index += 1
+                while index < len(children) and self._ready[children[index]]:
+                    index += 1
+                self._graded_prefix[parent_id] = index
+
+    def _check_verdict(self, testcase: str, verdict: str, score: float | None) -> bool:
+        """Raise ValueError if this grade cannot be set for the testcase; return False if
+        it was already set to this grade."""
+        if testcase not in self.testdata.groups_for_case:
+            raise ValueError(f"Use set_grade only for testcases, not {testcase}")
+        if verdict not in _VERDICT_CODE:
+            raise ValueError(f"Unknown verdict {verdict} for {testcase}")
+        old_grade = self.grade(testcase)
+        if old_grade is not None:
+            if old_grade != (verdict, score):
+                raise ValueError(f"Grade for {testcase} was already set (to {old_grade})")
+            return False
+        return True
+
+    def _record_verdict(self, testcase: str, verdict: str, score: float | None) -> bool:
+        """Set the grade of a testcase; return False if it was already set to this grade."""
+        if not self._check_verdict(testcase, verdict, score):
+            return False
+        self._set_grade(self.testdata.case_id[testcase], (verdict, score))
+        return True
 
     def set_verdict(
         self, testcase: str, verdict: str, score: float | None = None
@@ -205,25 +512,92 @@ class Grades:
         >>> h.set_verdict('foo', 'AC')
         [('sample', ('AC', 1.0)), ('secret', ('AC', 1.0)), ('.', ('AC', 2.0))]
         """
-        if not testcase in self.testdata.cases:
-            raise ValueError(f"Use set_grade only for testcases, not {testcase}")
-        if self._grade[testcase] is not None and self._grade[testcase] != (verdict, score):
-            raise ValueError(f"Grade for {testcase} was already set (to {self._grade[testcase]})")
-        self._grade[testcase] = (verdict, score)
+        if not self._record_verdict(testcase, verdict, score) or not self.streaming:
+            return []
         consequences = []
         for path in self.testdata.groups_for_case[testcase]:
             consequences.extend(self.generate_ancestor_grades(path))
         return consequences
 
+    def set_all_verdicts(
+        self, grades: dict[str, tuple[str, float | None]]
+    ) -> list[tuple[str, tuple[str, float]]]:
+        """Set the grades (verdict, score) of many testcases at once, then grade the
+        testgroups bottom-up, each once, as in finalize(). This is faster than calling
+        set_verdict for every testcase when all verdicts are known.
+
+        Returns the new testgroup grades, root last.
+
+        >>> g = Grades(['sample/1', 'secret/foo', 'secret/bar'])
+        >>> g.set_all_verdicts({'1': ('AC', None), 'foo': ('AC', 3), 'bar': ('WA', None)})
+        [('secret', ('WA', 0.0)), ('sample', ('AC', 1.0)), ('.', ('WA', 1.0))]
+        """
+        self._record_verdicts(grades)
+        return self.finalize()
+
+    def update(
+        self, grades: dict[str, str | tuple[str, float | None]]
+    ) -> list[tuple[str, tuple[str, float]]]:
+        """Set the verdicts of many testcases at once, like calling set_verdict for each.
+
+        The values are verdicts or grades (verdict, score). All of them are checked before
+        any is set. When streaming, the testgroups containing the new grades and their
+        ancestors are then graded once each, bottom-up; otherwise grading is left to
+        finalize(). Returns the new testgroup grades, root last.
+
+        >>> g = Grades(['sample/1', 'secret/foo', 'secret/bar'])
+        >>> g.update({'foo': 'AC', 'bar': ('AC', 2)})
+        [('secret', ('AC', 3.0))]
+        >>> g.update({'1': 'WA'})
+        [('sample', ('WA', 0.0)), ('.', ('WA', 0.0))]
+        """
+        testcases = self._record_verdicts(grades)
+        if not self.streaming:
+            return []
+        group_ids = set()
+        for testcase in testcases:
+            for path in self.testdata.groups_for_case[testcase]:
+                path_id = self.testdata.id[path]
+                while path_id >= 0 and path_id not in group_ids:
+                    group_ids.add(path_id)
+                    path_id = self.testdata.group_parent[path_id]
+        return self._grade_groups(sorted(group_ids, reverse=True))
+
+    def _record_verdicts(self, grades: dict[str, str | tuple[str, float | None]]) -> list[str]:
+        """Set the grades of many testcases, after checking all of them, so that an invalid
+        grade sets none. Returns the testcases whose grades are new."""
+        new_grades = []
+        for testcase, grade in grades.items():
+            verdict, score = (grade, None) if isinstance(grade, str) else grade
+            if self._check_verdict(testcase, verdict, score):
+                new_grades.append((testcase, (verdict, score)))
+        for testcase, grade in new_grades:
+            self._set_grade(self.testdata.case_id[testcase], grade)
+        return [testcase for testcase, _ in new_grades]
+
     def grade(self, node: str | None = None) -> tuple[str, float] | None:
         """The grade for a testgroup given as a string. If node is None, for the root.
 
         Returns:
             a tuple (verdict, score), or None if no grade has (yet) been determined.
         """
-        if node is None:
-            node = "."
-        return self._grade[node if node in self.testdata.cases else Path(node)]
+        return self._grade_at(self._node_id(node))
+
+    def _grade_at(self, i: int) -> tuple[str, float] | None:
+        if not self._ready[i]:
+            return None
+        score = self._score[i]
+        return (VERDICTS[self._verdict[i]], None if math.isnan(score) else score)
+
+    def to_dict(self) -> dict[str, tuple[str, float] | None]:
+        """The grades of all testgroups (None if not graded), ordered by depth.
+
+        >>> g = Grades(['sample/1', 'secret/foo'])
+        >>> _ = g.set_verdict('foo', 'WA')
+        >>> g.to_dict()
+        {'.': None, 'sample': None, 'secret': ('WA', 0.0)}
+        """
+        return {path: self._grade_at(i) for i, path in enumerate(self.testdata.groups)}
 
     def verdict(self, node: str | None = None) -> str | None:
         """The verdict for a node given as a string. If node is None, for the root.
@@ -243,51 +617,67 @@ class Grades:
 
     def is_accepted(self, node: str | None = None) -> bool:
         """Does the given node have an accepted verdict? If node is None, for the root."""
-        return self.verdict(node) == 'AC'
+        i = self._node_id(node)
+        return bool(self._ready[i]) and self._verdict[i] == 0
 
     def is_rejected(self, node=None) -> bool:
         """Does the given node have a rejected verdict? If node is None, for the root."""
-        return self.verdict(node) not in [None, 'AC']
+        i = self._node_id(node)
+        return bool(self._ready[i]) and self._verdict[i] != 0
 
     def generate_ancestor_grades(self, path):
-        """For a path of testcase node that just changed its grades[path]
-        (from None to a grade), generate the consequences for its ancestors, if any.
+        """For a testgroup path one of whose children just got a grade (it changed from
+        None to a grade), generate the consequences for path and its ancestors, if any.
         """
-        while True:
-            children = self.testdata.gradeables_for_group[path]
-            settings = self.testdata.testdata_settings(path)
-            first_error_idx = min(
-                (i for i, c in enumerate(children) if self.is_rejected(c)),
-                default=len(children),
-            )
-            if (
-                all(self._grade[c] for c in children)
-                or settings['on_reject'] == 'break'
-                and all(self.is_accepted(c) for c in children[:first_error_idx])
-            ):
-                grades = [self.grade(c) for c in children if self.grade(c) is not None]
-                grades_with_scores = [
-                    (
-                        verdict,
-                        score
-                        if score is not None
-                        else settings['accept_score' if verdict == 'AC' else 'reject_score'],
-                    )
-                    for verdict, score in grades
-                ]
-                aggregated_grade = aggregate(grades_with_scores, settings=settings)
-
-                if self._grade[path] is None:
-                    self._grade[path] = aggregated_grade
-                    yield (str(path), aggregated_grade)
-                elif self._grade[path] != aggregated_grade:
-                    raise ValueError(
-                        f"Grade {aggregated_grade} for {path.name} "
-                        + f"contradicts {self._grade[path]}"
-                    )
-            if path == Path():
+        path_id = self.testdata.id[path]
+        while path_id >= 0:
+            if self._ready[path_id]:
+                # already graded early because of on_reject: break, so the new grade
+                # of the child changes nothing
+                break
+            aggregated_grade = self._infer_grade(path_id, self._ungraded[path_id] == 0)
+            if aggregated_grade is None:
                 break
-            path = path.parent
+            self._set_grade(path_id, aggregated_grade)
+            yield (self.testdata.nodes[path_id], aggregated_grade)
+            path_id = self.testdata.group_parent[path_id]
+
+    def finalize(self) -> list[tuple[str, tuple[str, float]]]:
+        """Grade all testgroups that can be graded from the testcase grades set so far,
+        each testgroup once, bottom-up. Returns the new testgroup grades, root last.
+        """
+        # the ids of the testgroups are ordered by depth, like self.testdata.groups
+        return self._grade_groups(reversed(range(len(self.testdata.groups))))
+
+    def _grade_groups(self, path_ids) -> list[tuple[str, tuple[str, float]]]:
+        """Grade the ungraded testgroups with these ids, in this order, where possible.
+        Children must come before their parents."""
+        consequences = []
+        for path_id in path_ids:
+            if self._ready[path_id]:
+                continue
+            aggregated_grade = self._infer_grade(path_id, self._ungraded[path_id] == 0)
+            if aggregated_grade is not None:
+                self._set_grade(path_id, aggregated_grade)
+                consequences.append((self.testdata.nodes[path_id], aggregated_grade))
+        return consequences
+
+    def _infer_grade(self, path_id: int, all_graded: bool) -> tuple[str, float] | None:
+        """The grade of the testgroup with this id implied by the grades of its children,
+        or None.
+
+        all_graded: whether all children of the testgroup have been graded
+        """
+        grades = self._child_grades[path_id]
+        if not all_graded:
+            if not self.testdata.break_on_reject[path_id]:
+                return None
+            # All children before the first rejected child must be graded (and thus accepted)
+            first_rejection = self._first_rejection[path_id]
+            if self._graded_prefix[path_id] < first_rejection:
+                return None
+            grades = grades[: first_rejection + 1]
+        return aggregate(grades, settings=self.testdata.settings_by_id[path_id])
 
     def __str__(self):
         return self.tree_format()
@@ -322,31 +712,28 @@ class Grades:
         ├─sample ('AC', 1.0)
         └─secret ('WA', 0.0)
         """
-        paddinglength = max(
-            2 * len(path.parts) + len(path.name)
-            for path in self.testdata.gradeables_for_group
-            if path not in self.testdata.cases
-        )
-        return '\n'.join(self._rec(Path(), paddinglength, expectations=expectations))
-
-    def _rec(self, path, paddinglength, expectations=None, prefix='', last=True):
-        msg = (
-            ""
-            if expectations is None or expectations.is_expected(path)
-            else f", expected {expectations[path]}"
-        )
-        branch = '├─' if not last else '└─' if not path == Path() else 'data'
-        yield f"{prefix + branch +  path.name:{paddinglength}}" + f" {self.grade(path)}{msg}"
-        subgroups = list(
-            child
-            for child in self.testdata.gradeables_for_group[path]
-            if child not in self.testdata.cases
-        )
-        extension = '│ ' if not last else '  ' if not path == Path() else ''
-        for child, is_last in zip(subgroups, [False] * (len(subgroups) - 1) + [True]):
-            yield from self._rec(
-                child, paddinglength, prefix=prefix + extension, last=is_last
-            )
+        width = self.testdata.label_width
+        lines = []
+        # Pre-order traversal with an explicit stack; each entry is
+        # (path, prefix, whether path is the last child, expectations for path)
+        stack = [(self.testdata.root, '', True, expectations)]
+        while stack:
+            path, prefix, last, expectations = stack.pop()
+            if expectations is None or expectations.is_expected(path):
+                msg = ""
+            else:
+                verdicts, scores = expectations[path]
+                msg = f", expected ({set(verdicts)}, {scores!r})"
+            is_root = path == self.testdata.root
+            branch = '├─' if not last else '└─' if not is_root else 'data'
+            label = prefix + branch + self.testdata.name[path]
+            lines.append(f'{label.ljust(width)} {self._grade_at(self.testdata.id[path])}{msg}')
+            subgroups = self.testdata.subgroups[path]
+            extension = '│ ' if not last else '  ' if not is_root else ''
+            # push in reverse, so the first subgroup is popped first
+            for i in reversed(range(len(subgroups))):
+                stack.append((subgroups[i], prefix + extension, i == len(subgroups) - 1, None))
+        return '\n'.join(lines)
 
 
 def aggregate(grades, settings):
@@ -355,54 +742,232 @@ def aggregate(grades, settings):
         log('No grades given, so no graders ran')
         return ('AC', 0)
 
-    if settings['on_reject'] == 'break':
-        first_rejection = min(
-            (i for (i, grade) in enumerate(grades) if grade[0] != "AC"), default=None
+    return _aggregate_cached(tuple(grades), settings['grader_flags'], settings['on_reject'])
+
+
+# Many testgroups have identical grades (for instance, all accepted), so caching the
+# aggregated grades saves most grader calls. Maps (grades, grader_flags, on_reject,
+# external_grader) to the grade; judge errors are not cached, they may be transient.
+_aggregate_cache: dict[tuple, tuple[str, float]] = {}
+_AGGREGATE_CACHE_SIZE = 4096
+
+
+def _aggregate_cached(grades, grader_flags, on_reject):
+    key = (grades, grader_flags, on_reject, getattr(config.args, 'external_grader', False))
+    grade = _aggregate_cache.get(key)
+    if grade is not None:
+        return grade
+    # The order of grades matters, e.g. for first_error.
+    if on_reject == 'break':
+        # stop at the first rejection; later grades are never sent to the grader
+        for i, child_grade in enumerate(grades):
+            if child_grade[0] != 'AC':
+                grades = grades[: i + 1]
+                break
+    grade = call_default_grader(list(grades), grader_flags=grader_flags)
+    if grade[1] is not None:
+        if len(_aggregate_cache) >= _AGGREGATE_CACHE_SIZE:
+            _aggregate_cache.clear()
+        _aggregate_cache[key] = grade
+    return grade
+
+
+_GRADER_PATH = config.tools_root / 'support' / 'default_grader.py'
+
+# The default grader runs as a single long-lived process (started on first use)
+# that grades all requests; see support/default_grader.py for the protocol.
+_grader_server = None
+_grader_lock = threading.Lock()
+
+
+def _get_grader_server():
+    global _grader_server
+    if _grader_server is None or _grader_server.poll() is not None:
+        _grader_server = subprocess.Popen(
+            [_GRADER_PATH, '--server'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
         )
-        if first_rejection is not None:
-            grades = grades[: first_rejection + 1]
-    return call_default_grader(grades, grader_flags=settings["grader_flags"])
+    return _grader_server
 
 
-def call_default_grader(grades, grader_flags=None):
-    """Run the default grader to aggregate the given grades;
+def _stop_grader_server():
+    global _grader_server
+    if _grader_server is not None:
+        _grader_server.kill()
+        _grader_server.wait()
+        _grader_server = None
 
-    grades is a list of tuples
-    """
 
-    grader_input = '\n'.join(f"{g[0]} {g[1]}" for g in grades)
-    grader_flag_list = grader_flags.split() if grader_flags is not None else []
+atexit.register(_stop_grader_server)
 
-    grader = subprocess.Popen(
-        [config.tools_root / 'support' / 'default_grader.py'] + grader_flag_list,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        text=True,
-    )
 
+def _load_default_grader():
+    """Import support/default_grader.py, or return None if it cannot be imported."""
     try:
-        grader_output, _ = grader.communicate(input=grader_input, timeout=1)
-    except subprocess.TimeoutExpired:
-        error('Judge error: Grader timed out')
-        debug('Grader input: %s\n' % grader_input)
-        return ('JE', None)
+        spec = importlib.util.spec_from_file_location('default_grader', _GRADER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception as e:  # pylint: disable=broad-except
+        log(f'Cannot import the default grader, running it as a separate process: {e}')
+        return None
+    if not hasattr(module, 'run'):
+        log('The default grader has no run(), running it as a separate process')
+        return None
+    return module
+
+
+default_grader = _load_default_grader()
 
-    ret = grader.returncode
-    if ret != 0:
-        error('Judge error: exit code %d for grader %s, expected 0' % (ret, grader))
-        debug('Grader input: %s\n' % grader_input)
-        return ('JE', None)
 
-    grader_output_re = r'^((AC)|(WA)|(TLE)|(RTE)|(JE))\s+-?[0-9.]+\s*$'
-    if not re.match(grader_output_re, grader_output):
+# The order in which the default grader's worst_error picks a verdict, worst first
+_SEVERITY = {'JE': 0, 'RTE': 1, 'TLE': 2, 'WA': 3, 'AC': 4}
+
+
+class GraderFlag(enum.IntFlag):
+    """The flags understood by the default grader"""
+
+    SUM = enum.auto()
+    AVG = enum.auto()
+    MIN = enum.auto()
+    MAX = enum.auto()
+    WORST_ERROR = enum.auto()
+    NO_ERRORS = enum.auto()
+    FIRST_ERROR = enum.auto()
+    ALWAYS_ACCEPT = enum.auto()
+    ACCEPT_IF_ANY_ACCEPTED = enum.auto()
+    IGNORE_SAMPLE = enum.auto()
+
+
+# The grader flags for which the score is not simply the sum of scores
+_SCORE_FLAGS = GraderFlag.AVG | GraderFlag.MAX | GraderFlag.MIN | GraderFlag.IGNORE_SAMPLE
+
+
+def _grader_flag(flag: str) -> GraderFlag:
+    """The GraderFlag for a flag like 'first_error', or no flag if the grader ignores it.
+
+    The default grader compares flags case-sensitively, so 'Max' is not 'max'.
+    """
+    if flag == flag.lower() and flag.upper() in GraderFlag.__members__:
+        return GraderFlag[flag.upper()]
+    return GraderFlag(0)
+
+
+@lru_cache(maxsize=64)
+def _parse_grader_flags(grader_flags: str | None) -> tuple[tuple[str, ...], GraderFlag]:
+    """The grader flags as a tuple of strings (for the grader) and as a GraderFlag.
+
+    Unknown flags are passed on to the grader, but set no bits; TestData warns about them.
+    """
+    flag_list = tuple(grader_flags.split()) if grader_flags is not None else ()
+    bits = GraderFlag(0)
+    for flag in flag_list:
+        bits |= _grader_flag(flag)
+    return flag_list, bits
+
+
+def call_default_grader(grades, grader_flags=None):
+    """Run the default grader to aggregate the given grades;
+
+    grades is a list of tuples
+
+    The grader runs in-process, unless --external-grader is given or the grader
+    cannot be imported, in which case support/default_grader.py runs as a separate process.
+    """
+
+    grader_flag_list, flags = _parse_grader_flags(grader_flags)
+    if not getattr(config.args, 'external_grader', False):
+        if (
+            len(grades) == 1
+            and grades[0][0] in _VERDICT_CODE
+            and not flags & GraderFlag.ALWAYS_ACCEPT
+        ):
+            # Every aggregation of a single grade gives that grade.
+            return grades[0][0], float(grades[0][1])
+        # map and itemgetter loop over the grades in C; there are at most five verdicts
+        verdicts = set(map(itemgetter(0), grades))
+        if not grader_flag_list and verdicts <= _SEVERITY.keys():
+            # Without flags, the default grader takes the worst error and the sum of scores.
+            verdict = min(verdicts, key=_SEVERITY.__getitem__, default='AC')
+            return verdict, float(sum(map(float, map(itemgetter(1), grades))))
+        if not flags & _SCORE_FLAGS and verdicts <= {'AC'}:
+            # Every verdict aggregation accepts if all grades are accepted.
+            return 'AC', float(sum(map(float, map(itemgetter(1), grades))))
+        if default_grader is not None:
+            try:
+                verdict, score = default_grader.run(grades, grader_flag_list)
+            except Exception as e:  # pylint: disable=broad-except
+                error(f'Judge error: grader failed: {e!r}')
+                debug(f'Grader input: {grades} with flags {grader_flag_list}')
+                # the same grade as the grader's own output for a failure, 'JE 0'
+                return ('JE', 0.0)
+            return _checked_grade(verdict, score, f'{verdict} {score}')
+
+    lines = [f"{' '.join(grader_flag_list)}\t{len(grades)}\n"]
+    lines += [f"{verdict} {score}\n" for verdict, score in grades]
+    lines.append('END\n')
+    grader_input = ''.join(lines)
+
+    grader_output = None
+    # Grades may be computed from several threads; only one request at a time can be
+    # sent to the grader. If the grader process died, restart it once.
+    with _grader_lock:
+        for _ in range(2):
+            grader = _get_grader_server()
+            try:
+                grader.stdin.write(grader_input)
+                grader.stdin.flush()
+                if not select.select([grader.stdout], [], [], 1)[0]:
+                    error('Judge error: Grader timed out')
+                    debug('Grader input: %s\n' % grader_input)
+                    _stop_grader_server()
+                    return ('JE', None)
+                grader_output = grader.stdout.readline()
+            except OSError:
+                grader_output = None
+            if grader_output:
+                break
+            _stop_grader_server()
+
+    if not grader_output:
+        # The grader does not work as a server, so run it once for this request only.
+        try:
+            grader_output = subprocess.run(
+                [_GRADER_PATH, *grader_flag_list],
+                input=''.join(lines[1:-1]),
+                stdout=subprocess.PIPE,
+                text=True,
+                timeout=1,
+            ).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            grader_output = None
+        if not grader_output:
+            error('Judge error: grader %s exited unexpectedly' % _GRADER_PATH)
+            debug('Grader input: %s\n' % grader_input)
+            return ('JE', None)
+
+    # The output must be a verdict and a score, like 'AC 12.000000'
+    parts = grader_output.split()
+    if len(parts) != 2:
+        parts = [None, None]
+    return _checked_grade(parts[0], parts[1], grader_output)
+
+
+def _checked_grade(verdict, score, grader_output: str) -> tuple[str, float | None]:
+    """The grade (verdict, score) given by the grader, or a judge error if it is invalid."""
+    try:
+        if verdict not in _VERDICT_CODE:
+            raise ValueError
+        # the verdict is one of VERDICTS; return that (interned) string
+        return (VERDICTS[_VERDICT_CODE[verdict]], float(score))
+    except (TypeError, ValueError):
         error('Judge error: invalid format of grader output')
-        debug('Output must match: "%s"' % grader_output_re)
-        debug('Output was: "%s"' % grader_output)
+        debug('Output must be a verdict and a score')
+        debug('Output was: "%s"' % grader_output.strip())
         return ('JE', None)
 
-    verdict, score = grader_output.split()
-    return (verdict, float(score))
-
 
 if __name__ == "__main__":
     import doctest
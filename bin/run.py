@@ -503,13 +503,7 @@ class Submission(program.Program):
 
             # got_expected = result.verdict in ['ACCEPTED'] + self.expected_verdicts
             grading_results = grades.set_grade(
-                    run.testcase.name,
-                    {
-                        "ACCEPTED": "AC",
-                        "WRONG_ANSWER": "WA",
-                        "RUN_TIME_ERROR": "RTE",
-                        "TIME_LIMIT_EXCEEDED": "TLE",
-                    }[result.verdict],
+                    run.testcase.name, grading.SHORT_VERDICTS[result.verdict]
                 )
             got_expected = all(grades.is_expected(node) for (node, _) in grading_results)
 
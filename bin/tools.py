@@ -613,6 +613,11 @@ Run this from one of:
         action='store_true',
         help='Skip sanity checks on testcases.',
     )
+    runparser.add_argument(
+        '--external-grader',
+        action='store_true',
+        help='Run the default grader as a separate process instead of in-process.',
+    )
     runparser.add_argument(
         '--gradetree-depth',
         type=int,
@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 
 """ The default grader from kattis/problemtools/support/default_grader/default_grader
+
+Run with --server to grade many requests with a single process. Each request is a line
+'<flags>\t<N>', followed by N lines '<verdict> <score>' and a line 'END'; for each request,
+one line '<verdict> <score>' is written to stdout.
 """
 
 import sys
+from functools import lru_cache
+from operator import itemgetter
 
 
 def worst_error(verdicts):
     sorting_order = ['JE', 'IF', 'RTE', 'MLE', 'TLE', 'OLE', 'WA', 'PE', 'AC']
-    verdicts += ['AC']
-    index = min(sorting_order.index(verdict) for verdict in verdicts)
+    # only the distinct verdicts matter, and there are few of them
+    index = min(sorting_order.index(verdict) for verdict in set(verdicts) | {'AC'})
     return sorting_order[index]
 
 def first_error(verdicts):
@@ -40,25 +46,30 @@ score_aggregators = {
 }
 
 
-aggregate_scores = score_aggregators['sum']
-aggregate_verdicts = verdict_aggregators['worst_error']
-ignore_sample = False
-accept_if_any_accepted = False
-
-for flag in sys.argv:
-    if flag in score_aggregators:
-        aggregate_scores = score_aggregators[flag]
-    if flag in verdict_aggregators:
-        aggregate_verdicts = verdict_aggregators[flag]
-    if flag == 'ignore_sample':
-        ignore_sample = True
-    if flag == 'accept_if_any_accepted':
-        accept_if_any_accepted = True
-
-try:
-    data = sys.stdin.read().split()
-    verdicts = data[0::2]
-    scores = list(map(float, data[1::2]))
+@lru_cache(maxsize=None)
+def parse_flags(flags):
+    aggregate_scores = score_aggregators['sum']
+    aggregate_verdicts = verdict_aggregators['worst_error']
+    ignore_sample = False
+    accept_if_any_accepted = False
+
+    for flag in flags:
+        if flag in score_aggregators:
+            aggregate_scores = score_aggregators[flag]
+        if flag in verdict_aggregators:
+            aggregate_verdicts = verdict_aggregators[flag]
+        if flag == 'ignore_sample':
+            ignore_sample = True
+        if flag == 'accept_if_any_accepted':
+            accept_if_any_accepted = True
+
+    return aggregate_scores, aggregate_verdicts, ignore_sample, accept_if_any_accepted
+
+
+def aggregate(verdicts, scores, flags):
+    aggregate_scores, aggregate_verdicts, ignore_sample, accept_if_any_accepted = parse_flags(
+        tuple(flags)
+    )
     assert len(verdicts) == len(scores)
     if ignore_sample:
         assert 1 <= len(verdicts) <= 2
@@ -69,6 +80,43 @@ try:
     else:
         verdict = aggregate_verdicts(verdicts)
     score = aggregate_scores(scores)
-    print('%s %f' % (verdict, score))
-except:
-    print('JE 0')
+    return verdict, float(score)
+
+
+def run(grades, flags=()):
+    """Aggregate a list of (verdict, score) pairs; returns the grade as (verdict, score).
+
+    This is the entry point for running the grader in-process, e.g. from BAPCtools.
+    Invalid input raises an exception, which the caller reports as a judge error.
+    The score is rounded like in the output of grade(), so both give the same grade.
+    """
+    verdict, score = aggregate(
+        list(map(itemgetter(0), grades)), list(map(float, map(itemgetter(1), grades))), flags
+    )
+    return verdict, float('%f' % score)
+
+
+def grade(data, flags):
+    """Grade the whitespace-separated verdicts and scores in data; return the output line."""
+    try:
+        data = data.split()
+        return '%s %f' % aggregate(data[0::2], list(map(float, data[1::2])), flags)
+    except:
+        return 'JE 0'
+
+
+def serve():
+    for header in sys.stdin:
+        flags, count = header.rstrip('\n').split('\t')
+        data = ' '.join(sys.stdin.readline() for _ in range(int(count)))
+        if sys.stdin.readline().strip() != 'END':
+            print('JE 0', flush=True)
+            continue
+        print(grade(data, flags.split()), flush=True)
+
+
+if __name__ == '__main__':
+    if '--server' in sys.argv:
+        serve()
+    else:
+        print(grade(sys.stdin.read(), sys.argv))
@@ -1,15 +1,14 @@
 """ Test grading """
 
-import random
 from pathlib import Path
 
 import pytest
 from expectations import Expectations
 
-random.seed(0)
-
-GROUPS = ["secret/group1/foo", "secret/group1/bar", "secret/group2/baz", "sample/1"]
-ALL_VERDICTS = set(["AC", "TLE", "WA", "RTE"])
+GROUPS = ("secret/group1/foo", "secret/group1/bar", "secret/group2/baz", "sample/1")
+ALL_VERDICTS = frozenset({"AC", "TLE", "WA", "RTE"})
+AC = frozenset({"AC"})
+WA_OR_TLE = frozenset({"WA", "TLE"})
 
 # pylint: disable=no-self-use, missing-function-docstring
 
@@ -20,32 +19,32 @@ def test_set_expectations_four_different_ways():
             'secret': {'1': 'AC', '2': ['AC'], '3': {'verdict': 'AC'}, '4': {'verdict': ['AC']}}
         }
     )
-    assert e.verdicts("secret/1") == set(["AC"])
-    assert e.verdicts("secret/2") == set(["AC"])
-    assert e.verdicts("secret/3") == set(["AC"])
-    assert e.verdicts("secret/4") == set(["AC"])
+    assert e.verdicts("secret/1") == AC
+    assert e.verdicts("secret/2") == AC
+    assert e.verdicts("secret/3") == AC
+    assert e.verdicts("secret/4") == AC
 
 
 def test_set_expected_results():
     e = Expectations(expected_results=["CORRECT"])
-    assert e.verdicts() == set(["AC"])
+    assert e.verdicts() == AC
     e = Expectations(expected_results=["CORRECT", "WRONG-ANSWER"])
-    assert e.verdicts() != set(["AC"])
+    assert e.verdicts() != AC
 
 
 def test_set_from_dirname():
     e = Expectations(dirname="accepted")
-    assert e.verdicts() == set(["AC"])
+    assert e.verdicts() == AC
     e = Expectations(dirname="partially_accepted")
-    assert e.verdicts() != set(["AC"])
+    assert e.verdicts() != AC
 
 
 def test_Expectations_accept_inherited_downwards():
     # First see that AC from the root gets passed down
     e = Expectations(expectations="AC")
-    assert e.verdicts() == set(["AC"])
-    assert e.verdicts("secret") == set(["AC"])
-    assert e.verdicts("secret/group1/foo") == set(["AC"])
+    assert e.verdicts() == AC
+    assert e.verdicts("secret") == AC
+    assert e.verdicts("secret/group1/foo") == AC
 
 
 def test_Expectations_with_testgroups():
@@ -53,19 +52,19 @@ def test_Expectations_with_testgroups():
     e = Expectations(
         expectations={'verdict': ['WA', 'TLE'], 'sample': 'AC', 'secret': {'group1': ['AC']}}
     )
-    assert e.verdicts() == set(["WA", "TLE"])
-    assert e.verdicts("sample") == set(["AC"])
-    assert e.verdicts("secret/group1") == set(["AC"])
-    assert e.verdicts("secret/group1/foo") == set(["AC"])
+    assert e.verdicts() == WA_OR_TLE
+    assert e.verdicts("sample") == AC
+    assert e.verdicts("secret/group1") == AC
+    assert e.verdicts("secret/group1/foo") == AC
     assert "TLE" in e.verdicts("secret/group2/baz")
 
 
 def test_Expectations_one_testgroup():
     # Very simple example of expecations
     e = Expectations(expectations={'secret': {'group1': 'AC'}})
-    assert e.verdicts("secret/group1") == set(["AC"])
-    assert e.verdicts("secret/group1/subgroup") == set(["AC"])
-    assert e.verdicts("secret/group1/subgroup/sometask") == set(["AC"])
+    assert e.verdicts("secret/group1") == AC
+    assert e.verdicts("secret/group1/subgroup") == AC
+    assert e.verdicts("secret/group1/subgroup/sometask") == AC
     assert e.verdicts("secret/group2") == ALL_VERDICTS  # know nothing about 'secret'
 
 
@@ -73,12 +72,12 @@ def test_Expectations_ignore_sample():
     exp = Expectations(
         expectations="AC", testdata_settings={'.': {'grader_flags': 'ignore_sample'}}
     )
-    assert exp.verdicts() == exp.verdicts('secret') == set(["AC"])
+    assert exp.verdicts() == exp.verdicts('secret') == AC
     assert exp.verdicts('sample') == ALL_VERDICTS
     exp = Expectations(expectations="AC")
-    assert exp.verdicts() == exp.verdicts('secret') == exp.verdicts('sample') == set(["AC"])
+    assert exp.verdicts() == exp.verdicts('secret') == exp.verdicts('sample') == AC
     exp = Expectations(expectations="AC", testdata_settings={'.': {'grader_flags': ''}})
-    assert exp.verdicts() == exp.verdicts('secret') == exp.verdicts('sample') == set(["AC"])
+    assert exp.verdicts() == exp.verdicts('secret') == exp.verdicts('sample') == AC
 
 
 def test_Expectations_any_accepted():
@@ -88,6 +87,16 @@ def test_Expectations_any_accepted():
     assert exp.verdicts('sample') == exp.verdicts('secret') == ALL_VERDICTS
 
 
+def test_Expectations_testdata_settings_paths():
+    exp = Expectations(
+        expectations="AC", testdata_settings={'secret': {'grader_flags': 'always_accept'}}
+    )
+    settings = exp.testdata_settings('secret')
+    assert exp.testdata_settings(Path('secret')) is settings
+    assert exp.testdata_settings('secret/') is settings
+    assert exp.testdata_settings('')['grader_flags'] == ''
+
+
 def test_Expectations_always_accept():
     exp = Expectations(
         expectations="AC", testdata_settings={'.': {'grader_flags': 'always_accept'}}
@@ -96,8 +105,11 @@ def test_Expectations_always_accept():
 
 def test_Expectations_various_getters():
     exp = Expectations(expectations=["AC"])
-    assert exp[""] == exp['sample'] == (set(["AC"]), "-inf inf")
-    assert exp.verdicts() == exp.verdicts("") == exp.verdicts(".") == exp.verdicts('sample') == set(["AC"])
+    assert exp[""] == exp['sample'] == (AC, "-inf inf")
+    assert exp.verdicts() == exp.verdicts("") == exp.verdicts(".") == exp.verdicts('sample') == AC
+    assert isinstance(exp.verdicts(), frozenset)
+    # equal verdict sets are shared
+    assert Expectations(["WA", "TLE"]).verdicts() is Expectations({'secret': ["TLE", "WA"]}).verdicts('secret')
     assert exp.range() == exp.range("") == exp.range(".") == exp.range('sample') == "-inf inf"
     assert exp.is_expected("AC")
     assert exp.is_expected(("AC", float("-inf")))
@@ -109,7 +121,7 @@ def test_Expectations_various_getters():
 
 def test_Expectations_range():
     exp = Expectations(expectations={'verdict': 'AC', 'score': '0 23'})
-    assert exp[""] == (set(["AC"]), "0 23")
+    assert exp[""] == (AC, "0 23")
     assert exp.is_expected(("AC", 0))
     assert exp.is_expected(("AC", 23))
     assert exp.is_expected(("AC", 11))
@@ -1,90 +1,280 @@
 """ Test grading """
 
 import random
+import subprocess
 from pathlib import Path
 
 import pytest
-from grading import call_default_grader, Grades, aggregate, ancestors
+import config
+import grading
+from grading import call_default_grader, Grades, aggregate, ancestors, shared_testdata
 from grading import TestData as Data # to avoid confusing pytest about Test...
 
 
-random.seed(0)
+VERDICTS_BY_BADNESS = ["JE", "RTE", "TLE", "WA", "AC"]
+
+
+def _grader_cases(rng):
+    # all suffixes of VERDICTS_BY_BADNESS, shuffled, as grader input with its worst verdict
+    for i, worst in enumerate(VERDICTS_BY_BADNESS):
+        verdicts = VERDICTS_BY_BADNESS[i:]
+        rng.shuffle(verdicts)
+        yield worst, [(v, 0) for v in verdicts]
+
+
+GRADER_CASES = list(_grader_cases(random.Random(0)))
 
 # pylint: disable=no-self-use, missing-function-docstring
 class TestDefaultGrader:
-    def test_defaults(self):
-        # accept if all accept
-        assert call_default_grader([("AC", 42), ("AC", 58)]) == ("AC", 100)
+    @pytest.mark.parametrize(
+        "grades,expected",
+        [
+            ([("AC", 42), ("AC", 58)], ("AC", 100)),  # accept if all accept
+            ([("AC", 42), ("WA", 0)], ("WA", 42)),  # scoring mode should be `sum`
+        ],
+    )
+    def test_defaults(self, grades, expected):
+        assert call_default_grader(grades) == expected
 
-        # scoring mode should be `sum`
-        assert call_default_grader([("AC", 42), ("WA", 0)]) == ('WA', 42)
+    @pytest.mark.parametrize("worst,grader_input", GRADER_CASES)
+    def test_worst_verdict(self, worst, grader_input):
+        assert call_default_grader(grader_input)[0] == worst
 
-        verdicts_by_badness = ["JE", "RTE", "TLE", "WA", "AC"]
-        # check all suffixes of verdicts_by_badness
-        for i, worst in enumerate(verdicts_by_badness):
-            verdicts = verdicts_by_badness[i:]
-            random.shuffle(verdicts)
-            grader_input = [(v, 0) for v in verdicts]
-            assert call_default_grader(grader_input)[0] == worst
+    def test_external_grader(self, monkeypatch):
+        monkeypatch.setattr(config.args, 'external_grader', True, raising=False)
+        assert call_default_grader([("AC", 42), ("WA", 0)]) == ('WA', 42)
+        assert call_default_grader([("AC", 2), ("AC", 3)], grader_flags="min") == ('AC', 2)
+
+    @pytest.mark.parametrize("external", [False, True])
+    def test_invalid_grader_verdict(self, monkeypatch, external):
+        monkeypatch.setattr(config, 'RUNNING_TEST', False)
+        monkeypatch.setattr(config.args, 'external_grader', external, raising=False)
+        assert call_default_grader([("MLE", 1), ("AC", 2)], "first_error") == ('JE', None)
+
+    @pytest.mark.parametrize(
+        "grades,expected",
+        [
+            ([("MLE", 0), ("AC", 1)], ('JE', None)),  # the grader picks MLE, unknown here
+            ([("PE", 0), ("WA", 1)], ('WA', 1)),  # the grader ranks PE after WA
+        ],
+    )
+    def test_no_flags_unknown_verdict(self, monkeypatch, grades, expected):
+        monkeypatch.setattr(config, 'RUNNING_TEST', False)
+        assert call_default_grader(grades) == expected
+
+    @pytest.mark.parametrize("external", [False, True])
+    def test_grader_raises(self, monkeypatch, external):
+        monkeypatch.setattr(config, 'RUNNING_TEST', False)
+        monkeypatch.setattr(config.args, 'external_grader', external, raising=False)
+        assert call_default_grader([("AC", 1)] * 3, "ignore_sample") == ('JE', 0.0)
+        assert call_default_grader([("AC", 1), ("WA", "x")], "max") == ('JE', 0.0)
+
+    @pytest.mark.parametrize("external", [False, True])
+    def test_rounded_score(self, monkeypatch, external):
+        monkeypatch.setattr(config.args, 'external_grader', external, raising=False)
+        grades = [("AC", 1), ("WA", 2), ("AC", 2)]
+        assert call_default_grader(grades, "avg") == ('WA', 1.666667)
+
+    def test_grader_server_fails(self, monkeypatch):
+        monkeypatch.setattr(config.args, 'external_grader', True, raising=False)
+        broken = lambda: subprocess.Popen(
+            ['true'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        monkeypatch.setattr(grading, '_get_grader_server', broken)
+        assert call_default_grader([("AC", 2), ("AC", 3)], grader_flags="min") == ('AC', 2)
+
+    def test_grader_not_importable(self, monkeypatch):
+        monkeypatch.setattr(grading, 'default_grader', None)
+        assert call_default_grader([("AC", 42), ("WA", 0)], grader_flags="sum") == ('WA', 42)
+
+    def test_no_flags(self):
+        grades = [("WA", 1), ("AC", 2), ("TLE", 3), ("RTE", 4)]
+        assert call_default_grader(grades) == grading.default_grader.run(grades) == ('RTE', 10)
+        assert call_default_grader([]) == grading.default_grader.run([]) == ('AC', 0)
+
+    def test_many_grades(self):
+        rng = random.Random(0)
+        grades = [(rng.choice(VERDICTS_BY_BADNESS[1:]), rng.randint(0, 3)) for _ in range(1000)]
+        for flags in ["", "first_error", "max"]:
+            expected = grading.default_grader.run(grades, flags.split())
+            assert call_default_grader(grades, grader_flags=flags) == expected
+
+    def test_parse_grader_flags(self):
+        flags = grading.GraderFlag
+        assert grading._parse_grader_flags("max accept_if_any_accepted") == (
+            ("max", "accept_if_any_accepted"),
+            flags.MAX | flags.ACCEPT_IF_ANY_ACCEPTED,
+        )
+        assert grading._parse_grader_flags(None) == ((), flags(0))
+        # the grader compares flags case-sensitively
+        assert grading._parse_grader_flags("Max ALWAYS_ACCEPT")[1] == flags(0)
+
+    def test_unknown_grader_flags_warn(self, monkeypatch):
+        warnings = []
+        monkeypatch.setattr(grading, 'warn', warnings.append)
+        for _ in range(2):
+            Data(["secret/a/1"], {".": {"grader_flags": "Max sum bogus"}})
+        expected = ["Unknown grader flag Max is ignored", "Unknown grader flag bogus is ignored"]
+        assert warnings == expected * 2  # every tree warns, not only the first
+
+    def test_single_grade(self):
+        for grade in [("AC", 2), ("WA", 0)]:
+            for flags in ["", "first_error", "always_accept", "min", "ignore_sample"]:
+                expected = grading.default_grader.run([grade], flags.split())
+                assert call_default_grader([grade], grader_flags=flags) == expected
+
+    def test_single_unknown_grade(self, monkeypatch):
+        monkeypatch.setattr(config, 'RUNNING_TEST', False)
+        assert call_default_grader([("MLE", 2)]) == ('JE', None)
+
+    def test_all_accepted(self):
+        grades = [("AC", 2), ("AC", 3), ("AC", 1)]
+        for flags in ["first_error", "always_accept sum", "min", "avg"]:
+            expected = grading.default_grader.run(grades, flags.split())
+            assert call_default_grader(grades, grader_flags=flags) == expected
+
+
+FLAG_CASES = (("min", 2), ("max", 3), ("sum", 5), ("ignore_sample", 3))
 
 
 class TestAggregate:
-    def test_grader_flags(self):
+    @pytest.mark.parametrize("flag,outcome", FLAG_CASES)
+    def test_grader_flags(self, flag, outcome):
         grades = [("AC", 2), ("AC", 3)]
-        flags_and_outcomes = {"min": 2, "max": 3, "sum": 5, "ignore_sample": 3}
-
-        for flag, outcome in flags_and_outcomes.items():
-            assert aggregate(grades, {
-                "grader_flags": flag,
-                "on_reject": "break"
-                })[1] == outcome
-
-        grades.append(("WA", 5))
-        assert aggregate(grades, {
-            "grader_flags": "accept_if_any_accepted",
-            "on_reject": "continue",
-            }) == ("AC", 10)
-
-        grades.append(("WA", 5))
+        assert aggregate(grades, {"grader_flags": flag, "on_reject": "break"})[1] == outcome
+
+    @pytest.mark.parametrize(
+        "on_reject,grades",
+        [
+            ("continue", [("AC", 2), ("AC", 3), ("WA", 5)]),
+            ("break", [("AC", 2), ("AC", 3), ("WA", 5), ("WA", 5)]),
+        ],
+    )
+    def test_accept_if_any_accepted(self, on_reject, grades):
         assert aggregate(grades, {
             "grader_flags": "accept_if_any_accepted",
-            "on_reject": "break",
+            "on_reject": on_reject,
             }) == ("AC", 10)
 
-
-GROUPS = ["secret/group1/foo", "secret/group1/bar", "secret/group2/baz", "sample/1"]
-
-
-def test_ancestors():
-    assert ancestors((Path(p) for p in GROUPS)) == set(
-        Path(p) for p in [".", "sample", "secret", "secret/group1", "secret/group2"]
-    )
-
-
-def test_DataTree():
-    tree = Data(GROUPS)
+    def test_judge_errors_not_cached(self, monkeypatch):
+        results = iter([('JE', None), ('WA', 7.0)])
+        monkeypatch.setattr(grading, 'call_default_grader', lambda *_, **__: next(results))
+        grades = [("AC", 5), ("WA", 2)]
+        settings = {"grader_flags": "max", "on_reject": "continue"}
+        assert aggregate(grades, settings) == ('JE', None)
+        assert aggregate(grades, settings) == ('WA', 7.0)
+        assert aggregate(grades, settings) == ('WA', 7.0)  # cached, no third grader call
+
+    def test_cache_depends_on_external_grader(self, monkeypatch):
+        monkeypatch.setattr(config.args, 'external_grader', False, raising=False)
+        grades = [("AC", 6), ("WA", 1)]
+        settings = {"grader_flags": "min", "on_reject": "continue"}
+        assert aggregate(grades, settings) == ('WA', 1)
+        monkeypatch.setattr(config.args, 'external_grader', True)
+        monkeypatch.setattr(grading, 'call_default_grader', lambda *_, **__: ('AC', 0.0))
+        assert aggregate(grades, settings) == ('AC', 0.0)
+
+
+GROUPS = ("secret/group1/foo", "secret/group1/bar", "secret/group2/baz", "sample/1")
+ANCESTORS = frozenset({".", "sample", "secret", "secret/group1", "secret/group2"})
+# all paths of shared_testdata(GROUPS), breadth-first
+EXPECTED_ORDER = [
+    ".",
+    "sample",
+    "secret",
+    "sample/1",
+    "secret/group1",
+    "secret/group2",
+    "secret/group1/bar",
+    "secret/group1/foo",
+    "secret/group2/baz",
+]
+# testgroups containing both testcases and subgroups
+MIXED_GROUPS = GROUPS + ("secret/group2/subgroup/zap", "secret/group2/subgroup/boing")
+
+
+@pytest.fixture(scope="module")
+def tree():
+    # the same (read-only) testdata that every Grades(GROUPS) uses
+    return shared_testdata(GROUPS)
+
+
+@pytest.fixture(scope="module")
+def grades_template():
+    return Grades(GROUPS)
+
+
+@pytest.fixture
+def grades(grades_template):
+    # fresh grades for GROUPS, copied from an ungraded template
+    return grades_template.copy()
+
+
+def test_ancestors(tree):
+    assert ancestors(GROUPS) == ANCESTORS == set(tree.groups)
+
+
+def test_ancestors_many_paths():
+    paths = [f"secret/group{i % 10}/sub{i % 7}/case{i}" for i in range(10000)]
+    paths += [f"sample/{i}" for i in range(10)] + ["secret/group1", "secret/group1/case"]
+    expected = {"."}
+    for path in paths:
+        parts = path.split("/")
+        expected.update("/".join(parts[:i]) for i in range(1, len(parts)))
+    assert ancestors(paths) == expected
+
+
+@pytest.mark.parametrize("n", [10, 100, 1000, 10000])
+def test_DataTree_scaling(n):
+    # growing testdata, so that quadratic tree building shows up in pytest --durations
+    tree = Data([f"secret/g{i // 10}/t{i}" for i in range(n)])
+    assert len(tree.cases) == n
+    assert len(tree.groups) == 2 + (n + 9) // 10
+    assert len(list(tree)) == len(tree.groups) + n
+
+
+def test_DataTree(tree):
     assert len(tree.cases) == 4
     assert len(tree.gradeables_for_group) ==  5
-    assert Path() in tree.gradeables_for_group
-    assert "bar" in tree.gradeables_for_group[Path("secret/group1")]
-    assert "bar" not in tree.gradeables_for_group[Path("secret/group2")]
-    assert set(tree.gradeables_for_group[tree.root]) == set([Path("secret"), Path("sample")])
-
-# def test_DataTree_iteration():
-#     tree = DataTree(GROUPS)
-#     assert list(iter(tree)) == ['.', 'sample', 'secret', 'sample/1', 'secret/group1','secret/group2',
-#     'secret/group1/bar',
-#     'secret/group1/foo',
-#     'secret/group2/baz'
- #                              ]
+    assert "." in tree.gradeables_for_group
+    assert "bar" in tree.gradeables_for_group["secret/group1"]
+    assert "bar" not in tree.gradeables_for_group["secret/group2"]
+    assert set(tree.gradeables_for_group[tree.root]) == {"secret", "sample"}
+    assert tree.parent["secret/group1"] == "secret"
+    assert tree.parent["sample"] == tree.root
+    assert tree.nodes[tree.group_parent[tree.id["secret/group1"]]] == "secret"
+    assert tree.group_parent[tree.id[tree.root]] == -1
+    duplicated = Data(GROUPS + (Path("secret/group1/bar"),))
+    assert duplicated.gradeables_for_group == tree.gradeables_for_group
+
+def test_shared_testdata():
+    settings = {'secret': {'accept_score': '2'}}
+    assert Grades(GROUPS, settings).testdata is Grades(GROUPS[::-1], settings).testdata
+    assert Grades(GROUPS).testdata is not Grades(GROUPS, settings).testdata
+    assert shared_testdata(GROUPS) is shared_testdata(list(GROUPS))
+    trailing_slash = {'secret/': {'accept_score': '2'}}
+    assert shared_testdata(GROUPS, trailing_slash) is Grades(GROUPS, settings).testdata
+    unhashable = {'.': {'grader_flags': ['unhashable']}}
+    assert len(shared_testdata(iter(GROUPS), unhashable).cases) == len(GROUPS)
+
+def test_testcase_named_like_testgroup():
+    grades = Grades(["secret/sample", "sample/1"])
+    assert list(grades.testdata) == [".", "sample", "secret", "sample/1", "secret/sample"]
+    grades.set_verdict("sample", "WA")
+    assert grades.grade("secret") == ("WA", 0)
+    assert grades.grade("sample") == ("WA", None)  # the testcase, not the testgroup
+    grades.set_verdict("1", "AC")
+    assert grades.to_dict() == {".": ("WA", 1), "sample": ("AC", 1), "secret": ("WA", 0)}
+    assert str(grades) == "data     ('WA', 1.0)\n├─sample ('AC', 1.0)\n└─secret ('WA', 0.0)"
 
+def test_TestData_iteration(tree):
+    assert list(tree) == EXPECTED_ORDER
 
 
-def test_Grades_basics():
-    grades = Grades(GROUPS)
+def test_Grades_basics(grades):
     assert grades.grade(grades.testdata.root) is None
     grades.set_verdict("bar", "AC")
-    assert grades._grade["bar"] == ("AC", None)
+    assert grades.grade("bar") == ("AC", None)
     grades.set_verdict("foo", "AC", score=2)
     assert grades.grade("secret/group1") == ("AC", 3)
     assert grades.grade("secret/group2") is None
@@ -92,53 +282,115 @@ def test_Grades_basics():
     assert grades.grade("secret") == ("AC", 3)
     assert grades.grade() is None
     grades.set_verdict("1", "AC")
-    assert grades.grade(".") == grades.grade() == ("AC", 4)
+    assert grades.grade(".") == grades.grade() == grades.grade(Path(".")) == ("AC", 4)
+
+def test_Grades_finalize(grades):
+    grades.streaming = False
+    assert grades.set_verdict("bar", "AC") == []
+    grades.set_verdict("foo", "AC", score=2)
+    grades.set_verdict("baz", "AC", score=0)
+    assert grades.grade("secret/group1") is None
+    assert dict(grades.finalize()) == {
+        "secret/group1": ("AC", 3),
+        "secret/group2": ("AC", 0),
+        "secret": ("AC", 3),
+    }
+    grades.set_verdict("1", "AC")
+    assert grades.finalize() == [("sample", ("AC", 1)), (".", ("AC", 4))]
+
+def test_Grades_set_all_verdicts(grades):
+    grades.set_verdict("1", "AC")
+    assert grades.set_all_verdicts(
+        {"bar": ("AC", None), "foo": ("AC", 2), "baz": ("AC", 0)}
+    )[-1] == (".", ("AC", 4))
+    assert grades.grade("secret/group1") == ("AC", 3)
+    with pytest.raises(ValueError):
+        grades.set_all_verdicts({"foo": ("WA", None)})
+
+def test_Grades_update(grades):
+    assert grades.update({"bar": "AC", "foo": ("AC", 2)}) == [("secret/group1", ("AC", 3))]
+    assert grades.update({"baz": ("AC", 0), "1": "AC"})[-1] == (".", ("AC", 4))
+    assert grades.grade("secret") == ("AC", 3)
+    with pytest.raises(ValueError):
+        grades.update({"foo": "WA"})
+
+def test_Grades_update_checks_first(grades):
+    with pytest.raises(ValueError):
+        grades.update({"bar": "AC", "foo": "XX"})
+    assert grades.grade("bar") is None  # nothing was set
+
+def test_Grades_update_grades_ancestors_only(grades, monkeypatch):
+    inferred = []
+    infer_grade = Grades._infer_grade
+
+    def recording_infer_grade(self, path_id, all_graded):
+        inferred.append(path_id)
+        return infer_grade(self, path_id, all_graded)
+
+    monkeypatch.setattr(Grades, '_infer_grade', recording_infer_grade)
+    grades.update({"1": "AC"})
+    assert [grades.testdata.nodes[i] for i in inferred] == ["sample", "."]
+
+def test_Grades_update_not_streaming(grades):
+    grades.streaming = False
+    assert grades.update({"bar": "AC", "foo": ("AC", 2), "baz": ("AC", 0), "1": "AC"}) == []
+    assert grades.grade() is None
+    assert grades.finalize()[-1] == (".", ("AC", 4))
 
 def test_mixed_subgroups_and_cases():
-    grades = Grades(["secret/group1/foo",
-                    "secret/group1/bar",
-                     "secret/group2/baz",
-                     "secret/group2/subgroup/zap",
-                     "secret/group2/subgroup/boing",
-                     "sample/1"])
-
-def test_Grades_grader_flags():
-    # Now pass some grader flags using testdata_settings
-    grades2 = Grades(
-        GROUPS,
-        testdata_settings={
+    grades = Grades(MIXED_GROUPS)
+    grades.update({"1": "AC", "foo": "AC", "bar": "AC", "zap": "AC", "boing": "AC", "baz": "WA"})
+    assert grades.to_dict() == {
+        ".": ("WA", 3.0),
+        "sample": ("AC", 1.0),
+        "secret": ("WA", 2.0),
+        "secret/group1": ("AC", 2.0),
+        "secret/group2": ("WA", 0.0),  # on_reject: break, and baz comes before subgroup
+        "secret/group2/subgroup": ("AC", 2.0),
+    }
+
+GRADES_CASES = {
+    "grader_flags": (
+        {
             'secret/group1': {'grader_flags': 'max accept_if_any_accepted'},
             'secret': {'grader_flags': 'sum'},
             '.': {'grader_flags': 'sum'},
         },
-    )
-    assert grades2.testdata.testdata_settings(Path('secret/group1'))['grader_flags'] == 'max accept_if_any_accepted'
-    assert grades2.testdata.testdata_settings(Path('secret/group2'))['grader_flags'] == 'sum'
-    assert grades2.grade(".") is None
-    grades2.set_verdict("bar", "AC", score=5)
-    grades2.set_verdict("foo", "WA", score=6)
-    grades2.set_verdict("baz", "AC", score=4)
-    assert grades2.grade(".") is None
-    grades2.set_verdict("1", "AC", score=8)
-    assert grades2.grade("secret/group1") == ("AC", 6)
-    assert grades2.grade("secret") == ("AC", 10)
-    assert grades2.grade(".") == ("AC", 18)
-
-def test_Grades_accept_score_for_testgroup():
-    grades3 = Grades(
-        GROUPS,
-        testdata_settings={
+        [("bar", "AC", 5), ("foo", "WA", 6), ("baz", "AC", 4), ("1", "AC", 8)],
+        {"secret/group1": ("AC", 6), "secret": ("AC", 10), ".": ("AC", 18)},
+    ),
+    "accept_score_for_testgroup": (
+        {
             'secret/group1': {'accept_score': '12'},
             'secret/group2': {'accept_score': '21'},
         },
-    )
-    grades3.set_verdict("foo", "AC")
-    grades3.set_verdict("bar", "AC")
-    grades3.set_verdict("baz", "AC")
-    grades3.set_verdict("1", "AC")
-    assert grades3.grade("secret/group1") == ("AC", 24)
-    assert grades3.grade("secret") == ("AC", 45)
-    assert grades3.grade(".") == ("AC", 46)
+        [("foo", "AC", None), ("bar", "AC", None), ("baz", "AC", None), ("1", "AC", None)],
+        {"secret/group1": ("AC", 24), "secret": ("AC", 45), ".": ("AC", 46)},
+    ),
+    "recursive_inheritance_of_testdata_settings": (
+        {'.': {'accept_score': '2'}},
+        [("foo", "AC", None), ("bar", "AC", 1), ("baz", "AC", None), ("1", "AC", None)],
+        {".": ("AC", 7)},
+    ),
+}
+
+
+@pytest.mark.parametrize(
+    "settings,verdicts,expected", GRADES_CASES.values(), ids=GRADES_CASES.keys()
+)
+def test_Grades_with_settings(settings, verdicts, expected):
+    grades = Grades(GROUPS, testdata_settings=settings)
+    for testcase, verdict, score in verdicts:
+        assert grades.grade(".") is None  # the root needs all verdicts
+        grades.set_verdict(testcase, verdict, score=score)
+    for path, grade in expected.items():
+        assert grades.grade(path) == grade
+
+
+def test_Grades_inherited_grader_flags():
+    grades = Grades(GROUPS, testdata_settings=GRADES_CASES["grader_flags"][0])
+    assert grades.testdata.testdata_settings(Path('secret/group1'))['grader_flags'] == 'max accept_if_any_accepted'
+    assert grades.testdata.testdata_settings(Path('secret/group2'))['grader_flags'] == 'sum'
 
 
 def test_Grades_on_reject_break():
@@ -154,6 +406,9 @@ def test_Grades_on_reject_break():
     assert grades.verdict() is None # still don't know, verdicts are '?? WA AC ??'
     grades.set_verdict("a", 'AC')
     assert grades.verdict() == 'WA' # verdicts are 'AC WA AC ??', gradeable
+    assert grades.set_verdict("a", 'AC') == [] # setting the same grade again changes nothing
+    assert grades.set_verdict("d", 'AC') == []
+    assert grades.verdict() == 'WA'
 
 
 def test_Grades_first_error():
@@ -176,17 +431,6 @@ def test_Grades_worst_error():
     grades.set_verdict("3", "WA")
     assert grades.verdict() == "RTE"
 
-def test_recursive_inheritance_of_testdata_settings():
-    grades = Grades(
-        GROUPS,
-        testdata_settings={ '.': {'accept_score': '2'}}
-    )
-    grades.set_verdict("foo", "AC")
-    grades.set_verdict("bar", "AC", score=1)
-    grades.set_verdict("baz", "AC")
-    grades.set_verdict("1", "AC")
-    assert grades.grade() == ('AC', 7)
-
 def test_different_testdata_settings_for_same_testcase():
     grades = Grades(
         ['sample/foo', 'secret/foo'],
@@ -200,13 +444,7 @@ def test_different_testdata_settings_for_same_testcase():
 
 
 def test_prettyprint(capsys):
-    grades = Grades(["secret/group1/foo",
-                    "secret/group1/bar",
-                     "secret/group2/baz",
-                     "secret/group2/subgroup/zap",
-                     "secret/group2/subgroup/boing",
-                     "sample/1"]
-)
+    grades = Grades(MIXED_GROUPS)
     grades.set_verdict("1", "AC")
     grades.set_verdict("foo", "AC")
     grades.set_verdict("bar", "AC")